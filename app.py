@@ -152,6 +152,7 @@ try:
             }
         })
         # Update core's database instance
+        core.db.close()
         core.db = db
         logger.info("QA core initialized successfully")
     except Exception as e:
@@ -330,7 +331,7 @@ def show_dashboard():
         update_results_state()
     results = st.session_state.get("results", [])
     if results:
-        st.table([{k: v for k, v in r.__dict__.items() if not k.startswith('_sa_instance_state')} for r in results])
+        st.table([r._asdict() for r in results])
     else:
         st.info("No test results available yet.")
     if st.session_state.get("test_running"):
@@ -343,7 +344,10 @@ def discover_tests(test_type):
     """Discover available tests based on test type."""
     if test_type == "unit":
         test_dir = "tests/unit"
-        if not os.path.exists(test_dir):
+        # Listing the directory doubles as the existence check
+        try:
+            entries = os.listdir(test_dir)
+        except FileNotFoundError:
             return [], {
                 "error": f"❌ Unit test directory '{test_dir}' not found.",
                 "next_steps": [
@@ -357,7 +361,7 @@ def discover_tests(test_type):
                     "```"
                 ]
             }
-        test_files = [f for f in os.listdir(test_dir) if f.startswith("test_") and f.endswith(".py")]
+        test_files = [f for f in entries if f.startswith("test_") and f.endswith(".py")]
         if not test_files:
             return [], {
                 "error": f"❌ No unit test files found in '{test_dir}'.",
@@ -375,7 +379,10 @@ def discover_tests(test_type):
         return test_files, None
     elif test_type == "sample":
         sample_dir = "tests/sample"
-        if not os.path.exists(sample_dir):
+        # Listing the directory doubles as the existence check
+        try:
+            entries = os.listdir(sample_dir)
+        except FileNotFoundError:
             return [], {
                 "error": f"❌ Sample test directory '{sample_dir}' not found.",
                 "next_steps": [
@@ -389,7 +396,7 @@ def discover_tests(test_type):
                     "```"
                 ]
             }
-        test_files = [f for f in os.listdir(sample_dir) if f.endswith(".py")]
+        test_files = [f for f in entries if f.endswith(".py")]
         if not test_files:
             return [], {
                 "error": f"❌ No sample test files found in '{sample_dir}'.",
@@ -610,7 +617,7 @@ def show_reports_page():
     if results:
         # Convert results to DataFrame for better display
         import pandas as pd
-        df = pd.DataFrame([{k: v for k, v in r.__dict__.items() if not k.startswith('_sa_instance_state')} for r in results])
+        df = pd.DataFrame([r._asdict() for r in results])
         
         # Add timestamp column for sorting
         if 'timestamp' in df.columns:
@@ -746,25 +753,26 @@ def show_history_page():
         end_date = st.date_input("End Date", value=None)
     
     try:
-        # Get results based on time range
+        # Get results based on time range; all-time results are streamed so
+        # only the rows that pass the filters are kept in memory
         if time_range == "Last 24 Hours":
-            results = db.get_recent_results(days=1)
+            source = db.get_recent_results(days=1)
         elif time_range == "Last 7 Days":
-            results = db.get_recent_results(days=7)
+            source = db.get_recent_results(days=7)
         elif time_range == "Last 30 Days":
-            results = db.get_recent_results(days=30)
+            source = db.get_recent_results(days=30)
         else:
-            results = db.get_results()
+            source = db.iter_results()
         
-        # Apply filters
-        if search:
-            results = [r for r in results if search.lower() in (r.name or "").lower()]
-        if filter_type != "all":
-            results = [r for r in results if r.test_type == filter_type]
-        if start_date:
-            results = [r for r in results if r.timestamp.date() >= start_date]
-        if end_date:
-            results = [r for r in results if r.timestamp.date() <= end_date]
+        # Apply filters in a single pass
+        needle = search.lower()
+        results = [
+            r for r in source
+            if (not needle or needle in (r.test_name or "").lower())
+            and (filter_type == "all" or r.test_type == filter_type)
+            and (not start_date or r.timestamp.date() >= start_date)
+            and (not end_date or r.timestamp.date() <= end_date)
+        ]
         
         if results:
             # Get test summary
@@ -797,7 +805,7 @@ def show_history_page():
             # Convert to DataFrame for better display
             st.markdown("### Test Results")
             import pandas as pd
-            df = pd.DataFrame([{k: v for k, v in r.__dict__.items() if not k.startswith('_sa_instance_state')} for r in results])
+            df = pd.DataFrame([r._asdict() for r in results])
             
             # Sort by timestamp
             if 'timestamp' in df.columns:
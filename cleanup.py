@@ -21,6 +21,9 @@ def cleanup():
     # Files to clean
     files_to_clean = [
         "qa_results.db",
+        # SQLite write-ahead log and shared-memory index kept alongside the database in WAL mode
+        "qa_results.db-wal",
+        "qa_results.db-shm",
         ".coverage",
         "coverage.xml"
     ]
@@ -37,19 +40,15 @@ def cleanup():
             print(f"Removing file: {file_name}")
             os.remove(file_name)
     
-    # Clean __pycache__ directories recursively
+    # Clean __pycache__ and .pytest_cache directories recursively in a single walk
+    cache_dirs = {"__pycache__", ".pytest_cache"}
     for root, dirs, files in os.walk("."):
-        if "__pycache__" in dirs:
-            cache_dir = os.path.join(root, "__pycache__")
-            print(f"Removing directory: {cache_dir}")
-            shutil.rmtree(cache_dir)
-    
-    # Clean .pytest_cache directories recursively
-    for root, dirs, files in os.walk("."):
-        if ".pytest_cache" in dirs:
-            cache_dir = os.path.join(root, ".pytest_cache")
+        for dir_name in cache_dirs.intersection(dirs):
+            cache_dir = os.path.join(root, dir_name)
             print(f"Removing directory: {cache_dir}")
             shutil.rmtree(cache_dir)
+        # Don't descend into the directories just removed
+        dirs[:] = [d for d in dirs if d not in cache_dirs]
     
     print("\nCleanup completed successfully!")
 
@@ -16,7 +16,10 @@ async def run_tests(config: TestConfig):
     if not os.path.exists(config.config_path):
         raise HTTPException(status_code=400, detail="Config file not found")
     core = QACore(config.config_path)
-    results = core.run_tests(config.test_type)
+    try:
+        results = core.run_tests(config.test_type)
+    finally:
+        core.close()
     return {"status": "success", "results": results}
 
 @app.get("/health")
@@ -10,7 +10,10 @@ def cli():
 @click.option('--test-type', default='all', help='Test type to run')
 def run(config, test_type):
     core = QACore(config)
-    results = core.run_tests(test_type)
+    try:
+        results = core.run_tests(test_type)
+    finally:
+        core.close()
     click.echo(f"Test Results: {results}")
 
 cli.add_command(run)
@@ -2,16 +2,18 @@
 Core QA functionality for running tests and managing plugins.
 """
 import pytest
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 import yaml
 import os
+import asyncio
+import time
 from abc import ABC, abstractmethod
 import importlib
 from .database import QADatabase
+from .reports import remove_old_reports
 import sys
 import logging
 import tempfile
-from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
@@ -19,6 +21,29 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of E2E pages loading at the same time
+E2E_CONCURRENCY = 8
+
+# File name suffixes that identify test modules
+_TEST_SUFFIXES = ("_test.py", "test_.py", "test.py")
+
+def _deep_update(d: Dict[str, Any], u: Dict[str, Any]) -> bool:
+    """Recursively merge ``u`` into ``d`` in place, using an explicit stack.
+
+    Returns True if any value in ``d`` was added or changed.
+    """
+    changed = False
+    stack = [(d, u)]
+    while stack:
+        target, updates = stack.pop()
+        for k, v in updates.items():
+            if isinstance(v, dict) and isinstance(target.get(k), dict):
+                stack.append((target[k], v))
+            elif k not in target or target[k] != v:
+                target[k] = v
+                changed = True
+    return changed
+
 class BasePlugin(ABC):
     @abstractmethod
     def run(self, config):
@@ -37,10 +62,15 @@ class QACore:
         """Initialize QA core with configuration."""
         self.config_path = config_path
         self.config = self._load_config()
+        self._dirty = False
         self._setup_environment()
         self.plugins = self.load_plugins()
         self.db = QADatabase()
 
+    def close(self) -> None:
+        """Release database resources held by this instance."""
+        self.db.close()
+
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file."""
         try:
@@ -92,6 +122,12 @@ class QACore:
             if self.is_cloud_environment():
                 self._setup_cloud_environment()
             
+            # Cache the report directory used by get_report_paths and cleanup_reports
+            if self.is_cloud_environment():
+                self._reports_base = os.path.join(self.config.get("cloud", {}).get("temp_dir", "."), "reports")
+            else:
+                self._reports_base = "reports"
+            
             logger.info("Environment setup completed")
         except Exception as e:
             logger.error(f"Error setting up environment: {e}")
@@ -156,30 +192,32 @@ class QACore:
         try:
             with open(self.config_path, 'w') as f:
                 yaml.dump(self.config, f, default_flow_style=False)
+            self._dirty = False
             logger.info(f"Saved configuration to {self.config_path}")
         except Exception as e:
             logger.error(f"Error saving configuration: {e}")
             raise
     
-    def update_config(self, updates: Dict[str, Any]) -> None:
-        """Update configuration with new values."""
+    def update_config(self, updates: Dict[str, Any], flush: bool = True) -> None:
+        """Update configuration with new values.
+
+        Pass ``flush=False`` to batch several updates and write them once with ``flush()``.
+        """
         try:
-            # Deep update configuration
-            def deep_update(d: Dict[str, Any], u: Dict[str, Any]) -> Dict[str, Any]:
-                for k, v in u.items():
-                    if isinstance(v, dict) and k in d and isinstance(d[k], dict):
-                        d[k] = deep_update(d[k], v)
-                    else:
-                        d[k] = v
-                return d
-            
-            self.config = deep_update(self.config, updates)
-            self.save_config()
+            if _deep_update(self.config, updates):
+                self._dirty = True
+            if flush:
+                self.flush()
             logger.info("Configuration updated successfully")
         except Exception as e:
             logger.error(f"Error updating configuration: {e}")
             raise
     
+    def flush(self) -> None:
+        """Save configuration to file if it has unsaved changes."""
+        if self._dirty:
+            self.save_config()
+    
     def get_test_files(self, test_type: str) -> List[str]:
         """Get list of test files for a specific test type."""
         try:
@@ -189,9 +227,13 @@ class QACore:
                 return []
             
             test_files = []
-            for root, _, files in os.walk(test_dir):
+            for root, dirs, files in os.walk(test_dir):
+                # Prune hidden and cache directories so they are never walked
+                dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
                 for file in files:
-                    if file.endswith(("_test.py", "test_.py", "test.py")):
+                    if not file.endswith(".py"):
+                        continue
+                    if file.endswith(_TEST_SUFFIXES):
                         test_files.append(os.path.join(root, file))
             
             logger.info(f"Found {len(test_files)} test files for type: {test_type}")
@@ -212,13 +254,13 @@ class QACore:
         """Get paths for different report types."""
         try:
             reporting = self.config.get("reporting", {})
-            base_dir = self.config.get("cloud", {}).get("temp_dir", ".") if self.is_cloud_environment() else "."
+            base = self._reports_base
             
             paths = {}
             if reporting.get("json"):
-                paths["json"] = os.path.join(base_dir, "reports", f"{test_type}_{test_name}.json")
+                paths["json"] = f"{base}/{test_type}_{test_name}.json"
             if reporting.get("html"):
-                paths["html"] = os.path.join(base_dir, "reports", f"{test_type}_{test_name}.html")
+                paths["html"] = f"{base}/{test_type}_{test_name}.html"
             
             return paths
         except Exception as e:
@@ -229,25 +271,13 @@ class QACore:
         """Clean up old report files."""
         try:
             reporting = self.config.get("reporting", {})
-            base_dir = self.config.get("cloud", {}).get("temp_dir", ".") if self.is_cloud_environment() else "."
-            cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
+            cutoff_date = time.time() - (days * 24 * 60 * 60)
             
-            for report_type in ["json", "html"]:
-                if reporting.get(report_type):
-                    report_dir = os.path.join(base_dir, "reports")
-                    if os.path.exists(report_dir):
-                        for file in os.listdir(report_dir):
-                            file_path = os.path.join(report_dir, file)
-                            if os.path.getmtime(file_path) < cutoff_date:
-                                try:
-                                    if os.path.isfile(file_path):
-                                        os.remove(file_path)
-                                    elif os.path.isdir(file_path):
-                                        import shutil
-                                        shutil.rmtree(file_path)
-                                    logger.info(f"Deleted old report: {file_path}")
-                                except Exception as e:
-                                    logger.warning(f"Error deleting report {file_path}: {e}")
+            # JSON and HTML reports share one directory, so sweep it once
+            if reporting.get("json") or reporting.get("html"):
+                report_dir = self._reports_base
+                if os.path.exists(report_dir):
+                    remove_old_reports(report_dir, cutoff_date)
             
             logger.info(f"Cleaned up reports older than {days} days")
         except Exception as e:
@@ -359,28 +389,41 @@ class QACore:
             return [error_result]
 
     def run_playwright(self, url=None):
-        results = []
+        urls_to_test = [url] if url else self.config.get('e2e_tests', [])
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                urls_to_test = [url] if url else self.config.get('e2e_tests', [])
-                
-                for test_url in urls_to_test:
-                    try:
-                        page.goto(test_url)
-                        result = {"type": "e2e", "url": test_url, "status": "pass"}
-                        self.db.add_result(test_type="e2e", status="pass", test_name=test_url, duration=0.0)
-                        results.append(result)
-                    except Exception as e:
-                        result = {"type": "e2e", "url": test_url, "status": "fail",
-                                "error": str(e)}
-                        self.db.add_result(test_type="e2e", status="fail", test_name=test_url, duration=0.0)
-                        results.append(result)
-                browser.close()
-            return results
+            results = asyncio.run(self._run_playwright_async(urls_to_test))
         except Exception as e:
             error_result = {"type": "e2e", "status": "fail", "url": url or "all_urls",
                           "error": f"Playwright error: {str(e)}"}
             self.db.add_result(test_type="e2e", status="fail", test_name=url or "all_urls", duration=0.0)
-            return [error_result]
\ No newline at end of file
+            return [error_result]
+
+        self.db.add_results(
+            {"test_type": "e2e", "status": result["status"], "test_name": result["url"], "duration": 0.0}
+            for result in results
+        )
+        return results
+
+    async def _run_playwright_async(self, urls_to_test):
+        """Check URLs concurrently using one browser context shared by all pages."""
+        semaphore = asyncio.Semaphore(E2E_CONCURRENCY)
+
+        async def check(context, test_url):
+            async with semaphore:
+                page = await context.new_page()
+                try:
+                    await page.goto(test_url)
+                    return {"type": "e2e", "url": test_url, "status": "pass"}
+                except Exception as e:
+                    return {"type": "e2e", "url": test_url, "status": "fail",
+                            "error": str(e)}
+                finally:
+                    await page.close()
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                context = await browser.new_context()
+                return await asyncio.gather(*(check(context, test_url) for test_url in urls_to_test))
+            finally:
+                await browser.close()
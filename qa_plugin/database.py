@@ -3,14 +3,16 @@ Database module for QA Automation Plugin.
 """
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean
+from contextlib import contextmanager
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 import logging
-import traceback
-from sqlalchemy import inspect
+from sqlalchemy import event, inspect, select, insert, delete, func
+from .reports import delete_reports
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,9 +20,42 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Stored in SQLite's user_version header; bump it whenever the schema below changes
+SCHEMA_VERSION = 1
+
+# Applied to every new SQLite connection: WAL lets readers run alongside a writer
+# and, with synchronous=NORMAL, avoids an fsync on every commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+def _init_sqlite_connection(dbapi_connection, connection_record):
+    """Tune a new SQLite connection and hand transaction control to SQLAlchemy."""
+    # Disable pysqlite's implicit BEGIN; _begin_sqlite_transaction emits it instead
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+def _begin_sqlite_transaction(conn):
+    """Start a transaction explicitly, since the driver no longer does it."""
+    conn.exec_driver_sql("BEGIN")
+
 class TestResult(Base):
     """SQLAlchemy model for test results."""
     __tablename__ = 'test_results'
+    __table_args__ = (
+        Index('ix_tr_ts', 'timestamp'),
+        Index('ix_tr_type_ts', 'test_type', 'timestamp'),
+        Index('ix_tr_status', 'status'),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.now)
@@ -35,6 +70,10 @@ class TestResult(Base):
     def __repr__(self):
         return f"<TestResult(id={self.id}, test={self.test_name}, status={self.status})>"
 
+# Core-level INSERT shared by all writers; SQLAlchemy caches its compiled form,
+# and it skips the ORM's per-object unit-of-work bookkeeping
+_INSERT_STMT = insert(TestResult.__table__)
+
 class QADatabase:
     """Database manager for QA Automation Plugin."""
     
@@ -42,6 +81,14 @@ class QADatabase:
         """Initialize database connection."""
         try:
             self.db_path = db_path
+            self._is_cloud = os.environ.get('STREAMLIT_CLOUD', 'false').lower() == 'true'
+            
+            # Write generation, bumped by every writer; cached reads are valid
+            # only while it is unchanged. Writes made through other instances
+            # or processes are not seen.
+            self._gen = 0
+            self._stats_cache = (None, -1)
+            self._recent_cache = {}
             logger.info(f"Initializing database at: {self.db_path}")
             
             # Ensure database directory exists and is writable
@@ -49,7 +96,15 @@ class QADatabase:
             
             # Create engine with proper error handling
             try:
-                self.engine = create_engine(f'sqlite:///{self.db_path}')
+                # Keep a small pool of warm connections so calls never reopen the file
+                self.engine = create_engine(
+                    f'sqlite:///{self.db_path}',
+                    poolclass=QueuePool,
+                    pool_size=5,
+                    connect_args={"check_same_thread": False}
+                )
+                event.listen(self.engine, "connect", _init_sqlite_connection)
+                event.listen(self.engine, "begin", _begin_sqlite_transaction)
                 self.Session = scoped_session(sessionmaker(bind=self.engine))
                 self._init_db()
                 logger.info("Database initialized successfully")
@@ -81,11 +136,12 @@ class QADatabase:
     def _init_db(self):
         """Initialize database tables."""
         try:
-            # Test database connection using SQLAlchemy text()
-            from sqlalchemy import text
+            # A matching user_version means the schema is already current, so
+            # skip reflection; reading it also verifies the connection works
             with self.engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-                conn.commit()
+                if conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION:
+                    logger.info("Database schema is up to date")
+                    return
             
             # Check if table exists and has correct schema
             inspector = inspect(self.engine)
@@ -102,164 +158,276 @@ class QADatabase:
             
             # Create tables
             Base.metadata.create_all(self.engine)
+            
+            # create_all skips indexes of tables that already exist, so add any missing ones
+            for index in TestResult.__table__.indexes:
+                index.create(self.engine, checkfirst=True)
+            
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
             logger.info("Database tables created successfully")
         except Exception as e:
-            logger.error(f"Error initializing database tables: {str(e)}\n{traceback.format_exc()}")
+            logger.exception(f"Error initializing database tables: {str(e)}")
+            raise
+    
+    @contextmanager
+    def _session(self):
+        """Yield a write session that commits on success and rolls back on error.
+        
+        A successful commit bumps the write generation, invalidating cached reads.
+        """
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+            self._gen += 1
+        except Exception:
+            session.rollback()
             raise
+        finally:
+            session.close()
+    
+    def _read(self, stmt):
+        """Run a read-only statement on a plain connection and return all rows.
+        
+        Read paths skip the ORM session (identity map, unit of work) entirely;
+        rows expose columns as attributes, e.g. ``row.status``.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(stmt).all()
+    
+    def _results_query(self, limit=None):
+        """Build the newest-first SELECT used by get_results and iter_results."""
+        stmt = select(TestResult.__table__).order_by(TestResult.timestamp.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+        return stmt
     
     def get_results(self, limit=None):
         """Get test results from database."""
-        session = self.Session()
         try:
-            query = session.query(TestResult).order_by(TestResult.timestamp.desc())
-            if limit:
-                query = query.limit(limit)
-            results = query.all()
+            results = self._read(self._results_query(limit))
             logger.info(f"Retrieved {len(results)} test results")
             return results
         except Exception as e:
-            logger.error(f"Error fetching results: {str(e)}\n{traceback.format_exc()}")
+            logger.exception(f"Error fetching results: {str(e)}")
+            raise
+    
+    def iter_results(self, limit=None, batch_size=500):
+        """Stream test results from database, fetching ``batch_size`` rows at a time.
+        
+        The connection is returned to the pool when the generator is exhausted or closed.
+        """
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execution_options(yield_per=batch_size).execute(self._results_query(limit))
+                yield from result
+        except Exception as e:
+            logger.exception(f"Error streaming results: {str(e)}")
             raise
-        finally:
-            session.close()
     
     def add_result(self, test_type, test_name, status, duration, error_message=None, report_path=None):
-        """Add a new test result to the database."""
-        session = self.Session()
+        """Add a new test result to the database and return its ID."""
         try:
-            result = TestResult(
-                test_type=test_type,
-                test_name=test_name,
-                status=status,
-                duration=duration,
-                error_message=error_message,
-                report_path=report_path,
-                is_cloud=os.environ.get('STREAMLIT_CLOUD', 'false').lower() == 'true'
-            )
-            session.add(result)
-            session.commit()
+            with self._session() as session:
+                result = session.execute(_INSERT_STMT, {
+                    "test_type": test_type,
+                    "test_name": test_name,
+                    "status": status,
+                    "duration": duration,
+                    "error_message": error_message,
+                    "report_path": report_path,
+                    "is_cloud": self._is_cloud
+                })
             logger.info(f"Added test result: {test_name} ({status})")
-            return result
+            return result.inserted_primary_key[0]
         except Exception as e:
-            session.rollback()
             logger.error(f"Error adding test result: {e}")
             raise
-        finally:
-            session.close()
+    
+    def add_results(self, rows):
+        """Add many test results in a single transaction.
+        
+        Each row is a dict with the same keys as the arguments of add_result.
+        Returns the number of rows inserted.
+        """
+        # executemany needs every parameter set to carry the same keys
+        values = [
+            {"error_message": None, "report_path": None, "is_cloud": self._is_cloud, **row}
+            for row in rows
+        ]
+        if not values:
+            return 0
+        
+        try:
+            with self._session() as session:
+                session.execute(_INSERT_STMT, values)
+            logger.info(f"Added {len(values)} test results")
+            return len(values)
+        except Exception as e:
+            logger.error(f"Error adding test results: {e}")
+            raise
     
     def clear_results(self):
         """Clear all test results from the database."""
-        session = self.Session()
         try:
-            session.query(TestResult).delete()
-            session.commit()
+            with self._session() as session:
+                session.query(TestResult).delete(synchronize_session=False)
             logger.info("Cleared all test results")
         except Exception as e:
-            session.rollback()
             logger.error(f"Error clearing test results: {e}")
             raise
-        finally:
-            session.close()
     
     def get_latest_result(self):
-        """Get the most recent test result."""
-        session = self.Session()
+        """Get the most recent test result.
+        
+        Relies on the autoincrement ``id`` following insertion order, so the
+        primary key index finds the newest row without touching ``timestamp``.
+        """
         try:
-            return session.query(TestResult).order_by(TestResult.timestamp.desc()).first()
+            rows = self._read(
+                select(TestResult.__table__).order_by(TestResult.id.desc()).limit(1)
+            )
+            return rows[0] if rows else None
         except Exception as e:
             logger.error(f"Error fetching latest result: {e}")
             raise
-        finally:
-            session.close()
+    
+    def get_result_by_id(self, result_id):
+        """Get a single test result by its ID."""
+        try:
+            rows = self._read(select(TestResult.__table__).where(TestResult.id == result_id))
+            return rows[0] if rows else None
+        except Exception as e:
+            logger.error(f"Error fetching result {result_id}: {e}")
+            raise
+    
+    def get_test_history(self, test_name, limit=None):
+        """Get past results of a single test, newest first."""
+        try:
+            return self._read(self._results_query(limit).where(TestResult.test_name == test_name))
+        except Exception as e:
+            logger.error(f"Error fetching history for {test_name}: {e}")
+            raise
     
     def get_results_by_type(self, test_type):
         """Get test results filtered by test type."""
-        session = self.Session()
         try:
-            return session.query(TestResult).filter_by(test_type=test_type).order_by(TestResult.timestamp.desc()).all()
+            return self._read(self._results_query().where(TestResult.test_type == test_type))
         except Exception as e:
             logger.error(f"Error fetching results by type: {e}")
             raise
-        finally:
-            session.close()
     
     def get_results_by_status(self, status):
         """Get test results filtered by status."""
-        session = self.Session()
         try:
-            return session.query(TestResult).filter_by(status=status).order_by(TestResult.timestamp.desc()).all()
+            return self._read(self._results_query().where(TestResult.status == status))
         except Exception as e:
             logger.error(f"Error fetching results by status: {e}")
             raise
-        finally:
-            session.close()
     
     def get_results_by_date_range(self, start_date, end_date):
         """Get test results within a date range."""
-        session = self.Session()
         try:
-            return session.query(TestResult).filter(
+            return self._read(self._results_query().where(
                 TestResult.timestamp >= start_date,
                 TestResult.timestamp <= end_date
-            ).order_by(TestResult.timestamp.desc()).all()
+            ))
         except Exception as e:
             logger.error(f"Error fetching results by date range: {e}")
             raise
-        finally:
-            session.close()
+    
+    def get_recent_results(self, days=7):
+        """Get test results from the last ``days`` days, newest first."""
+        try:
+            cutoff_date = datetime.now() - timedelta(days=days)
+            gen, results = self._recent_cache.get(days, (-1, None))
+            if gen == self._gen:
+                # Rows may have aged out of the window since they were cached
+                return [r for r in results if r.timestamp >= cutoff_date]
+            
+            gen = self._gen
+            results = self._read(self._results_query().where(TestResult.timestamp >= cutoff_date))
+            self._recent_cache[days] = (gen, results)
+            return results
+        except Exception as e:
+            logger.error(f"Error fetching recent results: {e}")
+            raise
     
     def get_statistics(self):
         """Get test execution statistics."""
-        session = self.Session()
+        stats, gen = self._stats_cache
+        if gen == self._gen:
+            return dict(stats)
+        gen = self._gen
         try:
-            total = session.query(TestResult).count()
-            passed = session.query(TestResult).filter_by(status="passed").count()
-            failed = session.query(TestResult).filter_by(status="failed").count()
-            skipped = session.query(TestResult).filter_by(status="skipped").count()
+            # One grouped pass over the table instead of a COUNT per status
+            counts = dict(self._read(
+                select(TestResult.status, func.count()).group_by(TestResult.status)
+            ))
+            total = sum(counts.values())
+            passed = counts.get("passed", 0)
+            failed = counts.get("failed", 0)
+            skipped = counts.get("skipped", 0)
             
-            return {
+            stats = {
                 "total": total,
                 "passed": passed,
                 "failed": failed,
                 "skipped": skipped,
                 "pass_rate": (passed / total * 100) if total > 0 else 0
             }
+            self._stats_cache = (stats, gen)
+            return dict(stats)
         except Exception as e:
             logger.error(f"Error fetching statistics: {e}")
             raise
-        finally:
-            session.close()
+    
+    def get_test_summary(self):
+        """Get test execution statistics together with a per-type breakdown."""
+        try:
+            summary = self.get_statistics()
+            summary["by_type"] = dict(self._read(
+                select(TestResult.test_type, func.count()).group_by(TestResult.test_type)
+            ))
+            return summary
+        except Exception as e:
+            logger.error(f"Error fetching test summary: {e}")
+            raise
     
     def cleanup_old_results(self, days=30):
         """Clean up test results older than specified days."""
-        session = self.Session()
         try:
             cutoff_date = datetime.now() - timedelta(days=days)
-            old_results = session.query(TestResult).filter(TestResult.timestamp < cutoff_date).all()
-            
-            for result in old_results:
-                # Delete associated report files if they exist
-                if result.report_path and os.path.exists(result.report_path):
-                    try:
-                        os.remove(result.report_path)
-                        logger.info(f"Deleted report file: {result.report_path}")
-                    except Exception as e:
-                        logger.warning(f"Error deleting report file {result.report_path}: {e}")
+            with self._session() as session:
+                # Fetch just the report paths of expired rows
+                report_paths = session.execute(
+                    select(TestResult.report_path)
+                    .where(TestResult.timestamp < cutoff_date, TestResult.report_path.isnot(None))
+                ).scalars().all()
                 
-                session.delete(result)
-            
-            session.commit()
-            logger.info(f"Cleaned up {len(old_results)} old test results")
+                # Delete associated report files
+                delete_reports(report_paths)
+                
+                # Remove all expired rows with a single DELETE statement
+                result = session.execute(
+                    delete(TestResult).where(TestResult.timestamp < cutoff_date),
+                    execution_options={"synchronize_session": False}
+                )
+            logger.info(f"Cleaned up {result.rowcount} old test results")
         except Exception as e:
-            session.rollback()
             logger.error(f"Error cleaning up old results: {e}")
             raise
-        finally:
-            session.close()
     
-    def __del__(self):
-        """Cleanup when the database manager is destroyed."""
+    def close(self):
+        """Release the session registry and all pooled connections."""
         try:
             self.Session.remove()
-        except Exception as e:
-            logger.error(f"Error during database cleanup: {e}")
\ No newline at end of file
+        finally:
+            self.engine.dispose()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -3,25 +3,241 @@ Reporting functionality for QA Automation Plugin.
 """
 
 import os
-import json
+import re
+import orjson
 import logging
+import shutil
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTML report templates, parsed once at import rather than on every report
+_HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Test Result: {test_name}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        .container {{ max-width: 800px; margin: 0 auto; }}
+        .header {{ background-color: #f5f5f5; padding: 20px; border-radius: 5px; }}
+        .result {{ margin-top: 20px; }}
+        .passed {{ color: green; }}
+        .failed {{ color: red; }}
+        .skipped {{ color: orange; }}
+        .details {{ margin-top: 20px; }}
+        .error {{ background-color: #fff0f0; padding: 10px; border-radius: 5px; }}
+        .attachments {{ margin-top: 20px; }}
+        .attachment {{ margin-top: 10px; padding: 10px; background-color: #f9f9f9; border-radius: 5px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Test Result: {test_name}</h1>
+            <p>Type: {test_type}</p>
+            <p>Status: <span class="{status_class}">{status}</span></p>
+            <p>Timestamp: {timestamp}</p>
+            {duration_html}
+        </div>
+        {error_html}
+        {parameters_html}
+        {attachments_html}
+    </div>
+</body>
+</html>
+"""
+
+_ERROR_TEMPLATE = """
+    <div class="details">
+        <h2>Error Details</h2>
+        <div class="error">
+            <pre>{error_message}</pre>
+        </div>
+    </div>
+"""
+
+_PARAMETERS_TEMPLATE = """
+    <div class="details">
+        <h2>Test Parameters</h2>
+        <table>
+            <tr><th>Parameter</th><th>Value</th></tr>
+            {rows}
+        </table>
+    </div>
+"""
+
+_PARAMETER_ROW_TEMPLATE = """
+            <tr>
+                <td>{name}</td>
+                <td>{value}</td>
+            </tr>
+"""
+
+_ATTACHMENTS_TEMPLATE = """
+    <div class="attachments">
+        <h2>Attachments</h2>
+        {items}
+    </div>
+"""
+
+_ATTACHMENT_TEMPLATE = """
+        <div class="attachment">
+            <h3>{name}</h3>
+            <pre>{content}</pre>
+        </div>
+"""
+
+# Characters that are invalid in file names on common platforms, mapped to "_"
+_INVALID_FILENAME_CHARS = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+_INVALID_FILENAME_SET = frozenset('<>:"/\\|?*')
+_MULTI_UNDERSCORE = re.compile(r"_+")
+
+def _sanitize_filename(name: Any) -> str:
+    """Make a test name safe to embed in a report file name."""
+    name = str(name)
+    # Fast path: most test names are short and already clean
+    if len(name) <= 100 and "__" not in name and not _INVALID_FILENAME_SET.intersection(name):
+        return name.strip("_") or "unnamed_test"
+    name = name.translate(_INVALID_FILENAME_CHARS)
+    return _MULTI_UNDERSCORE.sub("_", name).strip("_")[:100] or "unnamed_test"
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write ``data`` to a temporary sibling, then rename it over ``path``.
+    
+    Readers never see a partially written report, even if the process dies mid-write.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Leave nothing half-written behind
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _report_filename(test_result: Dict[str, Any], stamp: int, extension: str) -> str:
+    """Build a unique file name for a saved report from its nanosecond ``stamp``."""
+    return (f"{_sanitize_filename(test_result['test_type'])}_{_sanitize_filename(test_result['test_name'])}_"
+            f"{stamp}.{extension}")
+
+# CSS class used for each known test status
+_STATUS_CLASS = {
+    "passed": "passed",
+    "failed": "failed",
+    "skipped": "skipped"
+}
+
+# Translation table for HTML-escaping user-supplied text in a single C-level pass
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;"
+})
+
+def _escape(value: Any) -> str:
+    """HTML-escape a value for insertion into a report."""
+    return str(value).translate(_ESCAPE_TABLE)
+
+def _format_timestamp(timestamp: Any, now: Optional[datetime] = None) -> str:
+    """Render a report timestamp as ISO text, defaulting to ``now`` or the current time."""
+    if timestamp is None:
+        return (now or datetime.now()).isoformat()
+    if isinstance(timestamp, datetime):
+        return timestamp.isoformat()
+    return timestamp
+
+def _delete_report(path: str, is_dir: bool = False) -> None:
+    """Delete one report file or directory, logging instead of raising on failure."""
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        logger.info(f"Deleted old report: {path}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Error deleting report {path}: {e}")
+
+def delete_reports(paths: List[str], is_dirs: Optional[List[bool]] = None) -> None:
+    """Delete report files, or directories where ``is_dirs`` says so.
+    
+    The deletions are independent of each other and run on a thread pool sized
+    to the work; no pool is started when there is nothing to delete.
+    """
+    if not paths:
+        return
+    if is_dirs is None:
+        is_dirs = [False] * len(paths)
+    with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+        list(executor.map(_delete_report, paths, is_dirs))
+
+def remove_old_reports(report_dir: str, cutoff: float) -> None:
+    """Delete entries of ``report_dir`` last modified before the Unix time ``cutoff``.
+    
+    Each entry is stat'ed once while scanning; the matches are then removed
+    with delete_reports().
+    """
+    paths, is_dirs = [], []
+    with os.scandir(report_dir) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError as e:
+                logger.warning(f"Error reading report {entry.path}: {e}")
+                continue
+            if st.st_mtime >= cutoff:
+                continue
+            if stat.S_ISDIR(st.st_mode) or stat.S_ISREG(st.st_mode):
+                paths.append(entry.path)
+                is_dirs.append(stat.S_ISDIR(st.st_mode))
+    
+    delete_reports(paths, is_dirs)
+
+# Optional report sections dropped when a reporter runs with optimize_report
+_OPTIONAL_SECTIONS = frozenset({"parameters", "attachments"})
+
 class BaseReporter:
-    """Base class for test reporters."""
+    """Base class for test reporters.
+    
+    Subclasses set ``EXTENSION`` and ``FORMAT_NAME`` and implement ``_encode``.
+    """
     
-    def __init__(self, output_dir: str):
-        """Initialize reporter with output directory."""
+    # File extension and display name of the reports; set by subclasses
+    EXTENSION = ""
+    FORMAT_NAME = ""
+    
+    def __init__(self, output_dir: str, optimize_report: bool = False):
+        """Initialize reporter with output directory.
+        
+        With ``optimize_report`` set, the bulky optional sections (parameters
+        and attachments) are left out of saved reports.
+        """
         self.output_dir = output_dir
+        self.optimize_report = optimize_report
         self._ensure_output_dir()
     
+    def _report_content(self, test_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the fields of a test result that belong in the saved report."""
+        if not self.optimize_report:
+            return test_result
+        return {k: v for k, v in test_result.items() if k not in _OPTIONAL_SECTIONS}
+    
     def _ensure_output_dir(self) -> None:
         """Ensure output directory exists."""
         try:
@@ -31,178 +247,170 @@ class BaseReporter:
             logger.error(f"Error creating output directory: {e}")
             raise
     
-    def save_report(self, test_result: Dict[str, Any]) -> str:
-        """Save test result report. To be implemented by subclasses."""
-        raise NotImplementedError("Subclasses must implement save_report method")
+    def _stamp_result(self, test_result: Dict[str, Any], now: Optional[datetime],
+                      stamp: Optional[int]) -> Tuple[datetime, int]:
+        """Resolve the report time and file stamp, adding a timestamp to ``test_result`` if missing.
+    
+        Both default to a single read of the current time.
+        """
+        stamp = stamp or time.time_ns()
+        now = now or datetime.fromtimestamp(stamp / 1e9)
+        if "timestamp" not in test_result:
+            test_result["timestamp"] = now.isoformat()
+        return now, stamp
+    
+    def _encode(self, test_result: Dict[str, Any], now: datetime) -> bytes:
+        """Encode a test result as report bytes. To be implemented by subclasses."""
+        raise NotImplementedError("Subclasses must implement _encode method")
+    
+    def save_report(self, test_result: Dict[str, Any], now: Optional[datetime] = None,
+                    stamp: Optional[int] = None) -> str:
+        """Save test result report.
+    
+        ``now`` stamps the report and ``stamp`` (nanoseconds since the epoch)
+        its file name.
+        """
+        try:
+            now, stamp = self._stamp_result(test_result, now, stamp)
+            filepath = os.path.join(self.output_dir, _report_filename(test_result, stamp, self.EXTENSION))
+            _write_atomic(filepath, self._encode(test_result, now))
+            logger.info(f"Saved {self.FORMAT_NAME} report: {filepath}")
+            return filepath
+        except Exception as e:
+            logger.error(f"Error saving {self.FORMAT_NAME} report: {e}")
+            raise
 
 class JSONReporter(BaseReporter):
     """JSON reporter for test results."""
     
-    def __init__(self, output_dir: str = "reports"):
-        """Initialize JSON reporter."""
-        super().__init__(output_dir)
+    EXTENSION = "json"
+    FORMAT_NAME = "JSON"
+    
+    # File that collects every result when running in single-file mode
+    SINGLE_FILE_NAME = "results.ndjson"
+    
+    def __init__(self, output_dir: str = "reports", optimize_report: bool = False,
+                 single_file: bool = False):
+        """Initialize JSON reporter.
+        
+        With ``single_file`` set, results are appended as JSON lines to one
+        ``results.ndjson`` file instead of each getting a file of its own.
+        """
+        super().__init__(output_dir, optimize_report)
+        self.single_file = single_file
     
-    def save_report(self, test_result: Dict[str, Any]) -> str:
-        """Save test result as JSON file."""
+    def save_report(self, test_result: Dict[str, Any], now: Optional[datetime] = None,
+                    stamp: Optional[int] = None) -> str:
+        """Save test result as JSON file, or as a line of the shared file in single-file mode."""
+        if not self.single_file:
+            return super().save_report(test_result, now, stamp)
         try:
-            # Add timestamp if not present
-            if "timestamp" not in test_result:
-                test_result["timestamp"] = datetime.now().isoformat()
+            self._stamp_result(test_result, now, stamp)
             
-            # Generate filename
-            filename = f"{test_result['test_type']}_{test_result['test_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Save report
-            with open(filepath, 'w') as f:
-                json.dump(test_result, f, indent=2)
-            
-            logger.info(f"Saved JSON report: {filepath}")
+            # Append one line per result; the buffered handle retries short
+            # writes, so the line is written in full or the save raises
+            filepath = os.path.join(self.output_dir, self.SINGLE_FILE_NAME)
+            with open(filepath, 'ab') as f:
+                f.write(orjson.dumps(self._report_content(test_result), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
+            logger.info(f"Appended JSON report: {filepath}")
             return filepath
         except Exception as e:
             logger.error(f"Error saving JSON report: {e}")
             raise
+    
+    def _encode(self, test_result: Dict[str, Any], now: datetime) -> bytes:
+        """Encode a test result as indented JSON; orjson handles datetime values natively."""
+        return orjson.dumps(self._report_content(test_result), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+def _msgpack_default(value: Any) -> Any:
+    """Convert values msgpack cannot encode natively."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+class MsgPackReporter(BaseReporter):
+    """MessagePack reporter for test results.
+    
+    Produces compact binary reports for machine consumption, e.g. CI artifact
+    stores; JSONReporter remains the human-readable format.
+    """
+    
+    EXTENSION = "msgpack"
+    FORMAT_NAME = "MessagePack"
+    
+    def __init__(self, output_dir: str = "reports", optimize_report: bool = False):
+        """Initialize MessagePack reporter."""
+        super().__init__(output_dir, optimize_report)
+    
+    def _encode(self, test_result: Dict[str, Any], now: datetime) -> bytes:
+        """Encode a test result as MessagePack."""
+        # Imported here so msgpack is only needed when this reporter is enabled
+        import msgpack
+        return msgpack.packb(self._report_content(test_result), use_bin_type=True, default=_msgpack_default)
 
 class HTMLReporter(BaseReporter):
     """HTML reporter for test results."""
     
-    def __init__(self, output_dir: str = "reports"):
+    EXTENSION = "html"
+    FORMAT_NAME = "HTML"
+    
+    def __init__(self, output_dir: str = "reports", optimize_report: bool = False):
         """Initialize HTML reporter."""
-        super().__init__(output_dir)
+        super().__init__(output_dir, optimize_report)
     
-    def save_report(self, test_result: Dict[str, Any]) -> str:
-        """Save test result as HTML file."""
-        try:
-            # Generate HTML content
-            html_content = self._generate_html(test_result)
-            
-            # Generate filename
-            filename = f"{test_result['test_type']}_{test_result['test_name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Save report
-            with open(filepath, 'w') as f:
-                f.write(html_content)
-            
-            logger.info(f"Saved HTML report: {filepath}")
-            return filepath
-        except Exception as e:
-            logger.error(f"Error saving HTML report: {e}")
-            raise
+    def _encode(self, test_result: Dict[str, Any], now: datetime) -> bytes:
+        """Render a test result as HTML, encoded once so it is written in a single call."""
+        return self._generate_html(test_result, now).encode('utf-8')
     
-    def _generate_html(self, test_result: Dict[str, Any]) -> str:
-        """Generate HTML content for test result."""
-        # Basic HTML template
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Test Result: {test_name}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .container {{ max-width: 800px; margin: 0 auto; }}
-                .header {{ background-color: #f5f5f5; padding: 20px; border-radius: 5px; }}
-                .result {{ margin-top: 20px; }}
-                .passed {{ color: green; }}
-                .failed {{ color: red; }}
-                .skipped {{ color: orange; }}
-                .details {{ margin-top: 20px; }}
-                .error {{ background-color: #fff0f0; padding: 10px; border-radius: 5px; }}
-                .attachments {{ margin-top: 20px; }}
-                .attachment {{ margin-top: 10px; padding: 10px; background-color: #f9f9f9; border-radius: 5px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Test Result: {test_name}</h1>
-                    <p>Type: {test_type}</p>
-                    <p>Status: <span class="{status_class}">{status}</span></p>
-                    <p>Timestamp: {timestamp}</p>
-                    {duration_html}
-                </div>
-                {error_html}
-                {parameters_html}
-                {attachments_html}
-            </div>
-        </body>
-        </html>
+    def _generate_html(self, test_result: Dict[str, Any], now: Optional[datetime] = None) -> str:
+        """Generate HTML content for test result.
+        
+        ``now`` is shown when the result has no timestamp of its own.
         """
+        content = self._report_content(test_result)
         
         # Format duration if available
         duration_html = ""
-        if "duration" in test_result:
-            duration_html = f"<p>Duration: {test_result['duration']:.2f} seconds</p>"
+        if "duration" in content:
+            duration_html = f"<p>Duration: {content['duration']:.2f} seconds</p>"
+        
+        status = content["status"]
         
         # Format error message if test failed
         error_html = ""
-        if test_result["status"] == "failed" and "error_message" in test_result:
-            error_html = f"""
-            <div class="details">
-                <h2>Error Details</h2>
-                <div class="error">
-                    <pre>{test_result['error_message']}</pre>
-                </div>
-            </div>
-            """
+        if status == "failed" and "error_message" in content:
+            error_html = _ERROR_TEMPLATE.format(error_message=_escape(content["error_message"]))
         
         # Format parameters if available
         parameters_html = ""
-        if "parameters" in test_result:
-            parameters_html = """
-            <div class="details">
-                <h2>Test Parameters</h2>
-                <table>
-                    <tr><th>Parameter</th><th>Value</th></tr>
-            """
-            for param_name, param_value in test_result["parameters"].items():
-                parameters_html += f"""
-                    <tr>
-                        <td>{param_name}</td>
-                        <td>{param_value}</td>
-                    </tr>
-                """
-            parameters_html += """
-                </table>
-            </div>
-            """
+        if "parameters" in content:
+            parameters_html = _PARAMETERS_TEMPLATE.format(rows="".join([
+                _PARAMETER_ROW_TEMPLATE.format(name=_escape(param_name), value=_escape(param_value))
+                for param_name, param_value in content["parameters"].items()
+            ]))
         
         # Format attachments if available
         attachments_html = ""
-        if "attachments" in test_result:
-            attachments_html = """
-            <div class="attachments">
-                <h2>Attachments</h2>
-            """
-            for name, content in test_result["attachments"].items():
-                if isinstance(content, str):
-                    attachments_html += f"""
-                    <div class="attachment">
-                        <h3>{name}</h3>
-                        <pre>{content}</pre>
-                    </div>
-                    """
-            attachments_html += "</div>"
+        if "attachments" in content:
+            attachments_html = _ATTACHMENTS_TEMPLATE.format(items="".join([
+                _ATTACHMENT_TEMPLATE.format(name=_escape(name), content=_escape(attachment))
+                for name, attachment in content["attachments"].items()
+                if isinstance(attachment, str)
+            ]))
         
         # Determine status class
-        status_class = {
-            "passed": "passed",
-            "failed": "failed",
-            "skipped": "skipped"
-        }.get(test_result["status"], "")
+        status_class = _STATUS_CLASS.get(status, "")
         
         # Format timestamp
-        timestamp = test_result.get("timestamp", datetime.now().isoformat())
-        if isinstance(timestamp, datetime):
-            timestamp = timestamp.isoformat()
+        timestamp = _format_timestamp(content.get("timestamp"), now)
         
         # Generate final HTML
-        return html_template.format(
-            test_name=test_result["test_name"],
-            test_type=test_result["test_type"],
-            status=test_result["status"],
+        return _HTML_TEMPLATE.format(
+            test_name=_escape(content["test_name"]),
+            test_type=_escape(content["test_type"]),
+            status=_escape(status),
             status_class=status_class,
-            timestamp=timestamp,
+            timestamp=_escape(timestamp),
             duration_html=duration_html,
             error_html=error_html,
             parameters_html=parameters_html,
@@ -222,16 +430,26 @@ class ReportManager:
         reporters = {}
         reporting_config = self.config.get("reporting", {})
         
+        # Leave out optional report sections if requested in config or environment
+        optimize = reporting_config.get("optimize", os.environ.get("QA_REPORT_OPTIMIZE") == "1")
+        
         # Get base directory for reports
         base_dir = self.config.get("cloud", {}).get("temp_dir", ".") if self.config.get("cloud", {}).get("enabled", False) else "."
         
         # Initialize JSON reporter if enabled
         if reporting_config.get("json", True):
-            reporters["json"] = JSONReporter(os.path.join(base_dir, "reports"))
+            reporters["json"] = JSONReporter(
+                os.path.join(base_dir, "reports"), optimize,
+                single_file=reporting_config.get("json_single_file", False)
+            )
         
         # Initialize HTML reporter if enabled
         if reporting_config.get("html", True):
-            reporters["html"] = HTMLReporter(os.path.join(base_dir, "reports"))
+            reporters["html"] = HTMLReporter(os.path.join(base_dir, "reports"), optimize)
+        
+        # Initialize MessagePack reporter if enabled (off unless configured)
+        if reporting_config.get("msgpack", False):
+            reporters["msgpack"] = MsgPackReporter(os.path.join(base_dir, "reports"), optimize)
         
         logger.info(f"Initialized {len(reporters)} reporters")
         return reporters
@@ -239,9 +457,12 @@ class ReportManager:
     def save_report(self, test_result: Dict[str, Any]) -> Dict[str, str]:
         """Save test result using all enabled reporters."""
         report_paths = {}
+        # Stamp every report of this result with the same time
+        stamp = time.time_ns()
+        now = datetime.fromtimestamp(stamp / 1e9)
         for reporter_name, reporter in self.reporters.items():
             try:
-                report_path = reporter.save_report(test_result)
+                report_path = reporter.save_report(test_result, now, stamp)
                 report_paths[reporter_name] = report_path
             except Exception as e:
                 logger.error(f"Error saving {reporter_name} report: {e}")
@@ -251,24 +472,14 @@ class ReportManager:
     
     def cleanup_reports(self, days: int = 30) -> None:
         """Clean up old report files."""
-        for reporter in self.reporters.values():
+        cutoff_date = time.time() - (days * 24 * 60 * 60)
+        # Reporters may share an output directory; sweep each directory once
+        for output_dir in {reporter.output_dir for reporter in self.reporters.values()}:
             try:
-                if os.path.exists(reporter.output_dir):
-                    cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-                    for file in os.listdir(reporter.output_dir):
-                        file_path = os.path.join(reporter.output_dir, file)
-                        if os.path.getmtime(file_path) < cutoff_date:
-                            try:
-                                if os.path.isfile(file_path):
-                                    os.remove(file_path)
-                                elif os.path.isdir(file_path):
-                                    import shutil
-                                    shutil.rmtree(file_path)
-                                logger.info(f"Deleted old report: {file_path}")
-                            except Exception as e:
-                                logger.warning(f"Error deleting report {file_path}: {e}")
+                if os.path.exists(output_dir):
+                    remove_old_reports(output_dir, cutoff_date)
             except Exception as e:
-                logger.error(f"Error cleaning up reports in {reporter.output_dir}: {e}")
+                logger.error(f"Error cleaning up reports in {output_dir}: {e}")
     
     def get_report_paths(self, test_type: str, test_name: str) -> Dict[str, str]:
         """Get paths for different report types."""
@@ -278,4 +489,6 @@ class ReportManager:
                 paths["json"] = os.path.join(reporter.output_dir, f"{test_type}_{test_name}.json")
             elif isinstance(reporter, HTMLReporter):
                 paths["html"] = os.path.join(reporter.output_dir, f"{test_type}_{test_name}.html")
+            elif isinstance(reporter, MsgPackReporter):
+                paths["msgpack"] = os.path.join(reporter.output_dir, f"{test_type}_{test_name}.msgpack")
         return paths
\ No newline at end of file
@@ -4,8 +4,11 @@ Sample functional tests demonstrating application functionality testing.
 import pytest
 import json
 import os
+import re
 from datetime import datetime
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 class TestCalculator:
     """Test calculator functionality."""
     
@@ -92,9 +95,7 @@ class TestDataValidation:
     def test_email_validation(self):
         """Test email address validation."""
         def is_valid_email(email):
-            import re
-            pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            return bool(re.match(pattern, email))
+            return _EMAIL_RE.match(email) is not None
         
         # Valid emails
         assert is_valid_email("user@example.com")
@@ -111,13 +112,18 @@ class TestDataValidation:
         def check_password_strength(password):
             if len(password) < 8:
                 return False
-            if not any(c.isupper() for c in password):
-                return False
-            if not any(c.islower() for c in password):
-                return False
-            if not any(c.isdigit() for c in password):
-                return False
-            return True
+            # Single pass over the password, stopping once every class is seen
+            has_upper = has_lower = has_digit = False
+            for c in password:
+                if c.isupper():
+                    has_upper = True
+                elif c.islower():
+                    has_lower = True
+                elif c.isdigit():
+                    has_digit = True
+                if has_upper and has_lower and has_digit:
+                    return True
+            return False
         
         # Strong passwords
         assert check_password_strength("StrongP@ss123")
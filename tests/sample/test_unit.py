@@ -1,7 +1,6 @@
 """
 Sample unit tests demonstrating basic test cases.
 """
-import pytest
 from datetime import datetime
 
 def test_string_operations():
@@ -37,12 +36,7 @@ def test_datetime_operations():
     assert 1 <= now.month <= 12
     assert 1 <= now.day <= 31
 
-@pytest.mark.parametrize("input_value,expected", [
-    (2, 4),
-    (3, 9),
-    (4, 16),
-    (5, 25),
-])
-def test_square_numbers(input_value, expected):
-    """Test squaring numbers with parameterized test."""
-    assert input_value ** 2 == expected 
\ No newline at end of file
+def test_square_numbers():
+    """Test squaring numbers, checking all cases in one test."""
+    for input_value, expected in [(2, 4), (3, 9), (4, 16), (5, 25)]:
+        assert input_value ** 2 == expected, f"{input_value} squared should be {expected}" 
\ No newline at end of file